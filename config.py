@@ -76,6 +76,12 @@ def parse_arguments():
         default=10,
         help="Number of documents to retrieve in retriever stage"
     )
+    parser.add_argument(
+        "--embedding-cache-size",
+        type=int,
+        default=5000,
+        help="Maximum number of embeddings kept in the in-memory LRU cache (0 disables caching); entries are stored as float32, about 4 bytes per dimension (~6 KB for 1536-dim vectors)"
+    )
     
     # Reranker 參數
     parser.add_argument(
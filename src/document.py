@@ -0,0 +1,9 @@
+from typing import Dict, Any
+from dataclasses import dataclass
+
+@dataclass(slots=True)
+class Document:
+    """文件資料結構"""
+    content: str
+    metadata: Dict[str, Any] = None
+    score: float = 0.0
@@ -1,7 +1,17 @@
 import os
+import re
+import sys
+import time
 import asyncio
+import hashlib
+from functools import lru_cache
 from typing import Optional, Literal, List
-from openai import OpenAI, AsyncOpenAI
+from openai import AsyncOpenAI
+try:
+    # openai 的私有模組，路徑可能隨版本變動；找不到時由 _response_format 自行組合
+    from openai.lib._parsing._completions import type_to_response_format_param
+except ImportError:
+    type_to_response_format_param = None
 from deepeval.models import DeepEvalBaseLLM
 from dotenv import load_dotenv
 from deepeval.metrics import (
@@ -12,11 +22,265 @@ from deepeval.metrics import (
     ContextualRelevancyMetric
 )
 from deepeval.test_case import LLMTestCase
-from pydantic import BaseModel, Field
+from deepeval.utils import get_or_create_event_loop
+from pydantic import BaseModel, Field, ValidationError
+from .cache import LRUCache
 
 # 載入環境變數
 load_dotenv()
 
+# 同步與異步生成共用的系統提示
+_SYSTEM_PROMPT = "你是一個專業的 AI 助手，專門生成符合指定結構的回應。請確保所有回應都完全符合提供的 schema 格式。"
+_SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_PROMPT}
+# 回應無法解析時，重試請求追加的提示
+_JSON_ONLY_MESSAGE = {"role": "user", "content": "Return ONLY valid JSON matching the schema, no prose."}
+
+
+def _build_messages(prompt: str) -> List[dict]:
+    """組合送給評審模型的對話訊息，系統訊息在所有呼叫間共用"""
+    return [_SYSTEM_MESSAGE, {"role": "user", "content": prompt}]
+
+
+def _loop_local(registry: dict, factory):
+    """返回目前事件迴圈在 registry 中的物件，不存在時以 factory 建立
+
+    異步 client 的連線池與號誌都綁定在第一次使用它們的迴圈上，不能跨迴圈共用。
+    這些物件會反向引用迴圈，弱引用無法自動釋放，因此每次查詢時順便移除已關閉迴圈的項目。
+    """
+    loop = asyncio.get_running_loop()
+    value = registry.get(loop)
+    if value is None:
+        for other in list(registry):
+            if other.is_closed():
+                registry.pop(other, None)
+        value = registry[loop] = factory()
+    return value
+
+
+# 每個事件迴圈各自的異步 client，依 (base_url, api_key) 區分
+_async_clients: "dict[asyncio.AbstractEventLoop, dict]" = {}
+
+
+async def _close_at_loop_shutdown(client: AsyncOpenAI):
+    """迴圈結束前（asyncio.run 會呼叫 shutdown_asyncgens）在原本的迴圈上關閉 client 的連線"""
+    try:
+        yield
+    finally:
+        await client.close()
+
+
+async def _shared_async_client(base_url: str, api_key: Optional[str]) -> AsyncOpenAI:
+    """返回目前事件迴圈中 (base_url, api_key) 共用的異步 client
+
+    同步與異步呼叫都經由 a_generate 送出，只需要異步 client；
+    同一迴圈內同一端點的所有評審實例共用 SDK 的 keep-alive 連線池，
+    重複建立評審不會再開新的連線。
+    """
+    clients = _loop_local(_async_clients, dict)
+    entry = clients.get((base_url, api_key))
+    if entry is None:
+        client = AsyncOpenAI(api_key=api_key, base_url=f"{base_url}/v1")
+        # 迴圈只以弱引用追蹤異步產生器，由 registry 保留強引用直到迴圈結束
+        closer = _close_at_loop_shutdown(client)
+        await closer.asend(None)
+        entry = clients[(base_url, api_key)] = (client, closer)
+    return entry[0]
+
+
+@lru_cache(maxsize=64)
+def _response_format(schema: type) -> dict:
+    """將 schema 轉為 response_format，每個 schema 類別只轉換一次
+
+    內容與 chat.completions.parse 每次呼叫時重新產生的 JSON Schema 相同；
+    openai 未提供轉換函數時，直接使用 pydantic 產生的 JSON Schema。
+    """
+    if type_to_response_format_param is not None:
+        return type_to_response_format_param(schema)
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": schema.__name__,
+            "schema": schema.model_json_schema(),
+        },
+    }
+
+
+# JSON 掃描只需要在括號、引號與跳脫字元上停下，其餘字元由正則引擎直接跳過
+_JSON_STRUCTURE_RE = re.compile(r'[{}"\\]')
+
+
+class _JsonSpanScanner:
+    """可逐段餵入文本的 JSON 物件掃描器，用於串流回應
+
+    追蹤巢狀深度與字串狀態，字串內的括號與跳脫字元不影響深度；
+    狀態在多次 feed 之間保留，跨段的跳脫字元也能正確處理。
+    """
+    def __init__(self, pos: int = 0):
+        self.text = ""
+        self._pos = pos
+        self._depth = 0
+        self._start = -1
+        self._in_string = False
+
+    def feed(self, piece: str) -> Optional[tuple]:
+        """加入一段文本，找到第一個括號平衡的 JSON 物件時返回其位置 (start, end)"""
+        self.text += piece
+        text = self.text
+        depth = self._depth
+        in_string = self._in_string
+        next_pos = self._pos
+        match = _JSON_STRUCTURE_RE.search(text, next_pos)
+        while match is not None:
+            i = match.start()
+            ch = text[i]
+            next_pos = i + 1
+            if in_string:
+                if ch == "\\":
+                    # 跳過被跳脫的字元
+                    next_pos = i + 2
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = depth > 0
+            elif ch == "{":
+                if depth == 0:
+                    self._start = i
+                depth += 1
+            elif ch == "}" and depth:
+                depth -= 1
+                if depth == 0:
+                    self._depth, self._in_string, self._pos = depth, in_string, next_pos
+                    return self._start, next_pos
+            match = _JSON_STRUCTURE_RE.search(text, next_pos)
+        self._depth, self._in_string = depth, in_string
+        self._pos = max(next_pos, len(text))
+        return None
+
+
+def _find_json_span(text: str, pos: int = 0) -> Optional[tuple]:
+    """從 pos 開始單次掃描，返回第一個括號平衡的 JSON 物件位置 (start, end)，找不到時返回 None"""
+    return _JsonSpanScanner(pos).feed(text)
+
+
+def _message_content(response) -> Optional[str]:
+    """取出回應中第一個選項的文字內容；回應沒有任何選項時返回 None"""
+    try:
+        return response.choices[0].message.content
+    except (AttributeError, IndexError, TypeError):
+        return None
+
+
+def _parse_content(content: Optional[str], schema: type) -> BaseModel:
+    """以 schema 驗證 JSON 內容
+
+    模型在 JSON 前後夾帶說明文字或 Markdown 區塊時，
+    依序取出內容中的 JSON 物件，返回第一個通過驗證的結果。
+    """
+    try:
+        return schema.model_validate_json(content)
+    except ValidationError:
+        if not content:
+            raise
+        span = _find_json_span(content)
+        while span is not None:
+            try:
+                return schema.model_validate_json(content[span[0]:span[1]])
+            except ValidationError:
+                span = _find_json_span(content, span[1])
+        raise
+
+
+@lru_cache(maxsize=64)
+def _default_field_values(schema: type) -> tuple:
+    """推導 schema 必填欄位的預設值，每個 schema 類別只推導一次
+
+    有預設值的欄位交給 pydantic 自行填入；必填欄位依型別給定佔位值，
+    不必每次解析失敗都先嘗試 schema() 再從例外中恢復。
+    """
+    default_values = []
+    for field_name, field_info in schema.model_fields.items():
+        if not field_info.is_required():
+            continue
+        annotation = field_info.annotation
+        if annotation == str:
+            value = "無法解析"
+        elif annotation == Optional[str]:
+            value = None
+        elif hasattr(annotation, '__origin__') and annotation.__origin__ == list:
+            # 處理 List 類型
+            value = []
+        elif annotation == float:
+            value = 0.0
+        elif annotation == int:
+            value = 0
+        elif annotation == bool:
+            value = False
+        else:
+            value = None
+        default_values.append((field_name, value))
+    return tuple(default_values)
+
+
+def _judge_max_concurrency(default: int = 16) -> int:
+    """讀取 JUDGE_MAX_CONCURRENCY；非整數時使用預設值，小於 1 時以 1 計算"""
+    raw = os.getenv("JUDGE_MAX_CONCURRENCY")
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        print(f"⚠️ JUDGE_MAX_CONCURRENCY 不是整數（{raw!r}），改用預設值 {default}")
+        return default
+    if value < 1:
+        print(f"⚠️ JUDGE_MAX_CONCURRENCY 必須至少為 1（目前為 {value}），改用 1")
+        return 1
+    return value
+
+
+# 同時進行中的評審請求上限，避免並行的指標一次湧入過多請求而觸發端點的速率限制
+_JUDGE_MAX_CONCURRENCY = _judge_max_concurrency()
+_judge_semaphores: "dict[asyncio.AbstractEventLoop, asyncio.Semaphore]" = {}
+
+
+def _judge_semaphore() -> asyncio.Semaphore:
+    """返回目前事件迴圈的評審並行上限號誌（號誌只能在建立它的迴圈中使用）"""
+    return _loop_local(
+        _judge_semaphores, lambda: asyncio.Semaphore(_JUDGE_MAX_CONCURRENCY)
+    )
+
+
+def _run(coro):
+    """在目前執行緒的事件迴圈上執行協程
+
+    使用 DeepEval 的事件迴圈：主執行緒共用同一個迴圈，其他執行緒各自建立自己的迴圈；
+    異步 client 與號誌依迴圈分開保存，因此可以從任何執行緒呼叫。
+    已在執行中的迴圈內呼叫時由 DeepEval 套用 nest_asyncio。
+    """
+    return get_or_create_event_loop().run_until_complete(coro)
+
+
+class JudgeCache(LRUCache):
+    """評審結果的 LRU 快取，以 (base_url, model, temperature, schema, prompt) 的 BLAKE2b 摘要作為鍵"""
+    def __init__(self, max_entries: int = 2048):
+        super().__init__(max_entries)
+
+    @staticmethod
+    def make_key(
+        base_url: str, model: str, temperature: float, schema: type, prompt: str
+    ) -> str:
+        """產生快取鍵：不同端點或取樣溫度的評審不共用結果"""
+        text = (
+            f"{base_url}|{model}|{temperature!r}|"
+            f"{schema.__module__}.{schema.__qualname__}|{prompt}"
+        )
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# 所有評審實例共用的結果快取：evaluate_rag_pipeline 每次都會建立新的評審，
+# 相同的提示（例如同一段上下文的相同判斷）在整個評估過程中只需請求一次
+_JUDGE_CACHE = JudgeCache()
+
+
 class CustomLLMJudge(DeepEvalBaseLLM):
     def __init__(
         self,
@@ -24,7 +288,8 @@ class CustomLLMJudge(DeepEvalBaseLLM):
         base_url: str = "https://litellm-ekkks8gsocw.dgx-coolify.apmic.ai",
         api_key: Optional[str] = None,
         max_tokens: int = 10000,
-        temperature: float = 0.7
+        temperature: float = 0.0,
+        stream_json: bool = False
     ):
         # 先初始化屬性，再調用父類的 __init__
         self.model = model
@@ -32,18 +297,15 @@ class CustomLLMJudge(DeepEvalBaseLLM):
         self.api_key = api_key or os.getenv("GENERATOR_API_KEY")
         self.max_tokens = max_tokens
         self.temperature = temperature
+        # 串流接收回應，收到第一個完整的 JSON 物件就關閉連線，不再等待其後的說明文字
+        self.stream_json = stream_json
         self._model_loaded = False
         
-        # 初始化 OpenAI client
-        self.client = OpenAI(
-            api_key=self.api_key, 
-            base_url=f"{self.base_url}/v1"
-        )
-        
-        # 初始化異步 OpenAI client
-        self.async_client = AsyncOpenAI(
-            api_key=self.api_key, 
-            base_url=f"{self.base_url}/v1"
+        # 每次請求都相同的參數只組合一次
+        self._base_kwargs = dict(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
         )
         
         # 最後調用父類的 __init__
@@ -59,98 +321,115 @@ class CustomLLMJudge(DeepEvalBaseLLM):
         return self.model  # 返回模型名稱字串而不是 self
 
     def generate(self, prompt: str, schema: BaseModel) -> BaseModel:
-        client = self.load_model()
-        
-        # 創建系統提示
-        system_prompt = "你是一個專業的 AI 助手，專門生成符合指定結構的回應。請確保所有回應都完全符合提供的 schema 格式。"
-        
-        
-        try:
-            # 使用 OpenAI client 的結構化解析功能
-            parsed = self.client.beta.chat.completions.parse(
-                model=client,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format=schema,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
-            
-            # 取得結構化結果
-            result = parsed.choices[0].message.parsed
-            return result
-            
-        except Exception as e:
-            print(f"結構化解析失敗: {e}")
-            print(f"原始提示長度: {len(prompt)} 字符")
-            print(f"使用的 max_tokens: {prompt}")
-            # 返回一個默認的 schema 實例
-            return self._create_default_schema_instance(schema)
+        """同步版本的 generate 方法：在共用的事件迴圈上執行 a_generate
+
+        同步與異步呼叫因此共用同一個異步 client 與連線池。
+        """
+        self.load_model()
+        return _run(self.a_generate(prompt, schema))
 
     def _create_default_schema_instance(self, schema: BaseModel) -> BaseModel:
         """創建 schema 的默認實例"""
-        try:
-            # 嘗試創建一個默認實例
-            return schema()
-        except Exception:
-            # 如果無法創建默認實例，嘗試手動創建
-            schema_fields = schema.model_fields
-            default_values = {}
-            
-            for field_name, field_info in schema_fields.items():
-                if hasattr(field_info, 'default') and field_info.default is not None:
-                    default_values[field_name] = field_info.default
-                elif field_info.annotation == str:
-                    default_values[field_name] = "無法解析"
-                elif field_info.annotation == Optional[str]:
-                    default_values[field_name] = None
-                elif hasattr(field_info.annotation, '__origin__') and field_info.annotation.__origin__ == list:
-                    # 處理 List 類型
-                    default_values[field_name] = []
-                elif field_info.annotation == float:
-                    default_values[field_name] = 0.0
-                elif field_info.annotation == int:
-                    default_values[field_name] = 0
-                elif field_info.annotation == bool:
-                    default_values[field_name] = False
-                else:
-                    default_values[field_name] = None
-            
-            return schema(**default_values)
+        return schema(**dict(_default_field_values(schema)))
 
 
 
     async def a_generate(self, prompt: str, schema: BaseModel) -> BaseModel:
-        """異步版本的 generate 方法"""
-        # 創建系統提示
-        system_prompt = "你是一個專業的 AI 助手，專門生成符合指定結構的回應。請確保所有回應都完全符合提供的 schema 格式。"
+        """異步版本的 generate 方法
+
+        直接等待 AsyncOpenAI 的請求而不阻塞事件迴圈，DeepEval 的異步指標
+        可以同時發出多個評審呼叫。
+        """
+        cache_key = JudgeCache.make_key(
+            self.base_url, self.model, self.temperature, schema, prompt
+        )
+        cached = _JUDGE_CACHE.get(cache_key)
+        if cached is not None:
+            return schema(**cached)
         
         try:
-            # 使用異步 OpenAI client 的結構化解析功能
-            response = await self.async_client.chat.completions.parse(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format=schema,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
+            messages = _build_messages(prompt)
+            content = await self._a_request_content(messages, schema)
+            try:
+                result = _parse_content(content, schema)
+            except ValidationError:
+                # 重試一次：保留原本的訊息（伺服器端可重用已快取的前綴），只追加要求純 JSON 的提示
+                content = await self._a_request_content(messages + [_JSON_ONLY_MESSAGE], schema)
+                result = _parse_content(content, schema)
             
-            # 取得結構化結果
-            result = response.choices[0].message.parsed
+            # 結構化結果寫入快取（解析失敗的預設實例不會被快取）
+            _JUDGE_CACHE.put(cache_key, result.model_dump())
             return result
             
+        except RuntimeError:
+            # 事件迴圈等執行環境錯誤不是評審回應的問題，直接拋出，不以預設實例掩蓋
+            raise
         except Exception as e:
-            print(f"異步結構化解析失敗: {e}")
+            print(f"結構化解析失敗: {e}")
             print(f"原始提示長度: {len(prompt)} 字符")
             print(f"使用的 max_tokens: {self.max_tokens}")
             # 返回一個默認的 schema 實例
             return self._create_default_schema_instance(schema)
 
+    async def _a_request_content(self, messages: List[dict], schema: BaseModel) -> Optional[str]:
+        """在並行上限內送出一次評審請求，返回模型回覆的文字內容"""
+        async with _judge_semaphore():
+            if self.stream_json:
+                return await self._a_stream_json(messages, schema)
+            # 使用目前迴圈共用的異步 OpenAI client 與預先轉換的 JSON Schema 請求結構化輸出
+            client = await _shared_async_client(self.base_url, self.api_key)
+            response = await client.chat.completions.create(
+                messages=messages,
+                response_format=_response_format(schema),
+                **self._base_kwargs
+            )
+            return _message_content(response)
+
+    async def _a_stream_json(self, messages: List[dict], schema: BaseModel) -> str:
+        """以串流方式請求，收到第一個完整的 JSON 物件後立即關閉串流，返回已接收的內容"""
+        client = await _shared_async_client(self.base_url, self.api_key)
+        stream = await client.chat.completions.create(
+            messages=messages,
+            response_format=_response_format(schema),
+            stream=True,
+            **self._base_kwargs
+        )
+        scanner = _JsonSpanScanner()
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                piece = chunk.choices[0].delta.content
+                if piece and scanner.feed(piece) is not None:
+                    break
+        finally:
+            await stream.close()
+        return scanner.text
+
+    async def a_batch_generate(self, prompts: List[str], schema: BaseModel) -> List[BaseModel]:
+        """同時送出多個評審請求，結果順序與 prompts 相同"""
+        return list(await asyncio.gather(
+            *(self.a_generate(prompt, schema) for prompt in prompts)
+        ))
+
+    def batch_generate(self, prompts: List[str], schema: BaseModel) -> List[BaseModel]:
+        """批次評審：在 DeepEval 共用的事件迴圈上並行執行所有請求
+
+        總耗時約為最慢的一次請求，而不是所有請求的總和。
+        """
+        if not prompts:
+            return []
+        return _run(self.a_batch_generate(prompts, schema))
+
+# 指標名稱對應的 DeepEval 指標類別
+_METRIC_CLASSES = {
+    "faithfulness": FaithfulnessMetric,
+    "answer_relevancy": AnswerRelevancyMetric,
+    "contextual_precision": ContextualPrecisionMetric,
+    "contextual_recall": ContextualRecallMetric,
+    "contextual_relevancy": ContextualRelevancyMetric,
+}
+
 def evaluate_rag_pipeline(
     query: str,
     actual_output: str,
@@ -195,30 +474,15 @@ def evaluate_rag_pipeline(
         retrieval_context=retrieval_context
     )
     
-    # 執行評估
+    # 建立指標：所有指標以異步模式執行，各指標內部的評審呼叫也會並行送出
+    selected = []
     for metric_name in metrics:
+        metric_class = _METRIC_CLASSES.get(metric_name)
+        if metric_class is None:
+            print(f"⚠️ 未知的評估指標: {metric_name}")
+            continue
         try:
-            if metric_name == "faithfulness":
-                metric = FaithfulnessMetric(model=custom_llm)
-            elif metric_name == "answer_relevancy":
-                metric = AnswerRelevancyMetric(model=custom_llm)
-            elif metric_name == "contextual_precision":
-                metric = ContextualPrecisionMetric(model=custom_llm)
-            elif metric_name == "contextual_recall":
-                metric = ContextualRecallMetric(model=custom_llm)
-            elif metric_name == "contextual_relevancy":
-                metric = ContextualRelevancyMetric(model=custom_llm)
-            else:
-                print(f"⚠️ 未知的評估指標: {metric_name}")
-                continue
-            
-            metric.measure(test_case)
-            results[metric_name] = {
-                "score": metric.score,
-                "reason": metric.reason
-            }
-            print(f"✅ {metric_name}: {metric.score}")
-            
+            selected.append((metric_name, metric_class(model=custom_llm, async_mode=True)))
         except Exception as e:
             print(f"❌ {metric_name} 評估失敗: {e}")
             results[metric_name] = {
@@ -226,4 +490,63 @@ def evaluate_rag_pipeline(
                 "reason": f"評估失敗: {e}"
             }
     
-    return results
+    # 並行執行評估：總耗時約為最慢的指標，而不是所有指標的總和
+    async def _measure_all():
+        return await asyncio.gather(
+            *(metric.a_measure(test_case) for _, metric in selected),
+            return_exceptions=True
+        )
+    
+    outcomes = _run(_measure_all()) if selected else []
+    for (metric_name, metric), outcome in zip(selected, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ {metric_name} 評估失敗: {outcome}")
+            results[metric_name] = {
+                "score": None,
+                "reason": f"評估失敗: {outcome}"
+            }
+            continue
+        results[metric_name] = {
+            "score": metric.score,
+            "reason": metric.reason
+        }
+        print(f"✅ {metric_name}: {metric.score}")
+    
+    # 依請求的指標順序返回結果
+    return {name: results[name] for name in metrics if name in results}
+
+
+async def _main(num_cases: int = 8) -> None:
+    """並行評估多個測試案例，觀察批次與異步呼叫在實際負載下的總耗時"""
+    judge = CustomLLMJudge()
+    samples = [
+        ("什麼是機器學習？", "機器學習是人工智慧的一個子集，使計算機能夠從數據中學習而無需明確編程。"),
+        ("什麼是深度學習？", "深度學習是機器學習的一個分支，使用多層神經網絡來處理複雜的模式識別任務。"),
+        ("什麼是自然語言處理？", "自然語言處理是人工智慧的一個領域，專注於計算機理解和生成人類語言。"),
+        ("什麼是計算機視覺？", "計算機視覺是人工智慧的一個分支，使計算機能夠理解和解釋視覺信息。"),
+    ]
+    test_cases = [
+        LLMTestCase(input=query, actual_output=answer, retrieval_context=[answer])
+        for query, answer in (samples[i % len(samples)] for i in range(num_cases))
+    ]
+    # 每個測試案例使用獨立的指標實例，分數與原因才不會互相覆蓋
+    metrics = [FaithfulnessMetric(model=judge, async_mode=True) for _ in test_cases]
+
+    print(f"🚀 並行評估 {num_cases} 個測試案例（評審並行上限 {_JUDGE_MAX_CONCURRENCY}）")
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        *(metric.a_measure(tc) for metric, tc in zip(metrics, test_cases)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+
+    for i, (metric, outcome) in enumerate(zip(metrics, outcomes), start=1):
+        if isinstance(outcome, Exception):
+            print(f"❌ 案例 {i} 評估失敗: {outcome}")
+        else:
+            print(f"✅ 案例 {i}: {metric.score}")
+    print(f"⏱️ 總耗時 {elapsed:.2f} 秒，平均每個案例 {elapsed / max(num_cases, 1):.2f} 秒")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
@@ -1,22 +1,42 @@
+import hashlib
+import uuid
+from array import array
 import requests
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 try:
     from tqdm import tqdm  # 可選依賴：若不存在則退回簡單列印
 except Exception:
     tqdm = None
-from dataclasses import dataclass
 from config import get_config
+from .cache import LRUCache
+from .document import Document
 from .text_chunker import DocumentChunker, TextChunker
 from .text_splitters import Language
 
-@dataclass
-class Document:
-    """文件資料結構"""
-    content: str
-    metadata: Dict[str, Any] = None
-    score: float = 0.0
+class EmbeddingCache(LRUCache):
+    """Embedding 的 LRU 快取，以 (model, text) 的 SHA-256 作為鍵
+
+    向量以 float32 的 array 儲存（1536 維約 6 KB，JSON 解析出的 list[float] 約 50 KB），
+    命中時再轉回 list；Chroma 本身也以 float32 儲存向量，因此不影響檢索結果。
+    """
+    def __init__(self, max_entries: int = 5000):
+        super().__init__(max_entries)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> bytes:
+        """產生快取鍵"""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[List[float]]:
+        """讀取快取，命中時返回 list[float]"""
+        embedding = super().get(key)
+        return embedding.tolist() if embedding is not None else None
+
+    def put(self, key: bytes, embedding: List[float]):
+        """以緊湊的 float32 形式寫入快取"""
+        super().put(key, array("f", embedding))
 
 class EmbeddingAPI:
     """Embedding API 客戶端"""
@@ -25,6 +45,7 @@ class EmbeddingAPI:
         self.api_key = config.generator_api_key
         self.base_url = base_url or config.retriever_base_url
         self.model = model or config.embedding_model
+        self.cache = EmbeddingCache(getattr(config, "embedding_cache_size", 5000))
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
@@ -57,9 +78,16 @@ class EmbeddingAPI:
         # 根據模型格式化文本
         #formatted_text = self._format_text_for_model(text, is_query)
         
+        # 相同的 (model, text) 必定得到相同的 embedding，重複查詢直接從快取取得
+        model = model or self.model
+        key = EmbeddingCache.make_key(model, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
         data = {
             "input": text,
-            "model": model or self.model
+            "model": model
         }
         
         try:
@@ -84,6 +112,7 @@ class EmbeddingAPI:
                 embedding = result["data"][0]["embedding"]
                 if embedding and len(embedding) > 0:
                     print(f"✅ 成功獲取 embedding，維度: {len(embedding)}")
+                    self.cache.put(key, embedding)
                     return embedding
                 else:
                     raise Exception("API 返回的 embedding 為空")
@@ -103,9 +132,16 @@ class EmbeddingAPI:
         # 根據模型格式化所有文本
         #formatted_texts = [self._format_text_for_model(text, is_query) for text in texts]
         
+        model = model or self.model
+        keys = [EmbeddingCache.make_key(model, text) for text in texts]
+        embeddings = [self.cache.get(key) for key in keys]
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+        if not missing:
+            return embeddings
+        
         data = {
-            "input": texts,
-            "model": model or self.model
+            "input": [texts[i] for i in missing],
+            "model": model
         }
         try:
             r = self.session.post(
@@ -117,7 +153,14 @@ class EmbeddingAPI:
             r.raise_for_status()
             result = r.json()
             if "data" in result and len(result["data"]) > 0:
-                return [d["embedding"] for d in result["data"]]
+                fetched = [d["embedding"] for d in result["data"]]
+                if len(fetched) != len(missing):
+                    raise Exception(f"預期 {len(missing)} 個 embedding，但只收到 {len(fetched)} 個")
+                for i, emb in zip(missing, fetched):
+                    embeddings[i] = emb
+                    if emb:
+                        self.cache.put(keys[i], emb)
+                return embeddings
             else:
                 raise Exception("API 返回的數據格式不正確")
         except requests.exceptions.RequestException as e:
@@ -210,7 +253,6 @@ class ChromaVectorStore:
         ids = []
         texts = []
         metadatas = []
-        embeddings = []
         
         # 先嘗試獲取一個 embedding 來確定維度
         embedding_dimension = None
@@ -222,14 +264,8 @@ class ChromaVectorStore:
             print(f"⚠️ 無法確定 embedding 維度: {e}")
             embedding_dimension = 1536  # 預設維度
         
-        total_docs = len(documents_to_add)
-        iterator = documents_to_add
-        if tqdm is not None:
-            iterator = tqdm(documents_to_add, desc="Embedding documents", unit="doc")
-
-        for i, doc in enumerate(iterator):
+        for i, doc in enumerate(documents_to_add):
             # 生成唯一 ID - 使用更可靠的方式
-            import uuid
             doc_id = f"doc_{i}_{uuid.uuid4().hex[:8]}"
             ids.append(doc_id)
             
@@ -244,44 +280,26 @@ class ChromaVectorStore:
                 "is_chunked": self.enable_chunking
             })
             metadatas.append(metadata)
-            
-            # 獲取 embedding（文檔不需要 query 前綴）
-            try:
-                embedding = self.embedding_api.get_embedding(doc.content, is_query=False)
-                if embedding and len(embedding) > 0:
-                    embeddings.append(embedding)
-                else:
-                    raise Exception("獲取到的 embedding 為空")
-            except Exception as e:
-                print(f"⚠️ 獲取 embedding 失敗 (文檔 {i+1}): {e}")
-                # 如果 API 失敗，使用零向量作為備用
-                zero_embedding = [0.0] * embedding_dimension
-                embeddings.append(zero_embedding)
-
-            # 簡易進度輸出（當未安裝 tqdm 時）
-            if tqdm is None and total_docs > 0:
-                if (i + 1) == 1 or (i + 1) % 5 == 0 or (i + 1) == total_docs:
-                    print(f"⏳ 進度: {i + 1}/{total_docs}")
         
         # 若沒有可添加的文檔，直接返回
-        if not ids and len(documents_to_add) == 0:
+        if not ids:
             print("⚠️ 沒有可添加的文件，跳過")
             return
 
         # 批量添加到 Chroma
         try:
-            if not ids or not embeddings:
-                print("⚠️ 空的 ids 或 embeddings，跳過添加")
-                return
-            
-            # 使用批次 API 進行嵌入（修正版本）
+            # 使用批次 API 進行嵌入；embedding 只在這裡計算一次，
+            # 全部完成後再以單次 collection.add 寫入，避免逐批 commit 造成的 SQLite fsync
+            total_docs = len(texts)
             batch_size = 64 # 設定批次大小
             final_embeddings = []
             
-            for i in range(0, len(texts), batch_size):
+            batch_starts = range(0, total_docs, batch_size)
+            if tqdm is not None:
+                batch_starts = tqdm(batch_starts, desc="Embedding documents", unit="batch")
+
+            for i in batch_starts:
                 batch_texts = texts[i:i+batch_size]
-                batch_ids = ids[i:i+batch_size]
-                batch_metadatas = metadatas[i:i+batch_size]
                 
                 batch_embs = self.embedding_api.get_embeddings(batch_texts, is_query=False)
                 
@@ -296,6 +314,10 @@ class ChromaVectorStore:
                         # 如果 API 失敗，使用零向量作為備用
                         final_embeddings.append([0.0] * embedding_dimension)
 
+                # 簡易進度輸出（當未安裝 tqdm 時）
+                if tqdm is None:
+                    print(f"⏳ 進度: {min(i + batch_size, total_docs)}/{total_docs}")
+
             self.collection.add(
                 ids=ids,
                 documents=texts,
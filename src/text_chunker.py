@@ -1,9 +1,10 @@
 import re
 from typing import List, Dict, Any
 from dataclasses import dataclass
+from .document import Document
 from .text_splitters import RecursiveCharacterTextSplitter, CharacterTextSplitter, Language
 
-@dataclass
+@dataclass(slots=True)
 class TextChunk:
     """文本塊結構"""
     content: str
@@ -80,13 +81,18 @@ class TextChunker:
         text_chunks = self.splitter.split_text(text)
         
         chunks = []
+        # 分割器依序輸出文本塊，下一塊的起點不會早於上一塊的起點，
+        # 因此從上一塊的起點繼續搜尋，避免每次都從頭掃描整篇原文
+        search_from = 0
         for i, chunk_text in enumerate(text_chunks):
+            # 計算在原文中的位置（近似）
+            start_index = text.find(chunk_text, search_from)
+            if start_index == -1:
+                start_index = i * self.chunk_size  # 近似位置
+            else:
+                search_from = start_index
+
             if len(chunk_text.strip()) >= self.min_chunk_size:
-                # 計算在原文中的位置（近似）
-                start_index = text.find(chunk_text)
-                if start_index == -1:
-                    start_index = i * self.chunk_size  # 近似位置
-                
                 chunk = TextChunk(
                     content=chunk_text.strip(),
                     metadata=metadata.copy() if metadata else {},
@@ -145,7 +151,7 @@ class DocumentChunker:
             language=None
         )
     
-    def chunk_documents(self, documents: List['Document']) -> List['Document']:
+    def chunk_documents(self, documents: List[Document]) -> List[Document]:
         """
         將文檔列表分割成塊
         
@@ -155,30 +161,10 @@ class DocumentChunker:
         Returns:
             分塊後的文檔列表
         """
-        chunked_documents = []
-
-        # 動態獲取 Document 類，避免循環導入
-        def _get_document_class():
-            from .retriever import Document  # 延遲導入
-            return Document
-        Document = _get_document_class()
-
-        for doc in documents:
-            # 分割文本
-            text_chunks = self.chunker.split_text(doc.content, doc.metadata)
-            
-            # 轉換為 Document 對象
-            for chunk in text_chunks:
-                chunked_doc = Document(
-                    content=chunk.content,
-                    metadata=chunk.metadata,
-                    score=doc.score
-                )
-                chunked_documents.append(chunked_doc)
-        
-        return chunked_documents
-
-# 為了避免循環導入，使用字符串類型提示
-from typing import TYPE_CHECKING
-if TYPE_CHECKING:
-    from .retriever import Document
+        # 分割文本並轉換為 Document 對象
+        split_text = self.chunker.split_text
+        return [
+            Document(content=chunk.content, metadata=chunk.metadata, score=doc.score)
+            for doc in documents
+            for chunk in split_text(doc.content, doc.metadata)
+        ]
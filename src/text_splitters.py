@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import os
 import re
-from typing import Any, Literal, Optional, Union
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
+from operator import add, sub
+from typing import Any, Iterator, Literal, Optional, Union
 from abc import ABC, abstractmethod
+from enum import Enum
 
 
-class Language:
-    """支援的程式語言枚舉"""
+class Language(str, Enum):
+    """支援的程式語言枚舉
+
+    繼承 str，成員可直接與對應的字串值比較，也可用字串查詢分隔符表。
+    """
     C = "c"
     CPP = "cpp"
     GO = "go"
@@ -51,42 +61,121 @@ class TextSplitter(ABC):
         self._chunk_overlap = chunk_overlap
         self._length_function = length_function or len
         self._keep_separator = keep_separator
+        # 逐字符分割再合併等同於固定大小的滑動視窗；長度以字符計且重疊小於塊大小時直接切片
+        self._slice_character_windows = (
+            self._length_function is len and max(chunk_overlap, 0) < chunk_size
+        )
     
     @abstractmethod
     def split_text(self, text: str) -> list[str]:
         """分割文本"""
         pass
+
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        """逐一產生分割後的文本塊，讓呼叫端可以邊分割邊處理"""
+        yield from self.split_text(text)
+
+    def split_documents(
+        self,
+        texts: list[str],
+        max_workers: Optional[int] = None,
+        use_threads: bool = False,
+    ) -> list[list[str]]:
+        """平行分割多個文本，返回與輸入順序對應的塊列表
+
+        預設使用 ProcessPoolExecutor 以繞過 GIL，此時分割器會被 pickle 到子程序，
+        自訂的 length_function 必須是模組層級的函數（不能是 lambda 或閉包）。
+        use_threads=True 時改用 ThreadPoolExecutor，適合 length_function 本身不持有 GIL 的情況。
+        """
+        if not texts:
+            return []
+        max_workers = max_workers or os.cpu_count() or 1
+        if max_workers == 1 or len(texts) == 1:
+            return [self.split_text(text) for text in texts]
+        if use_threads:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(self.split_text, texts))
+        chunksize = max(1, len(texts) // (4 * max_workers))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.split_text, texts, chunksize=chunksize))
     
+    def _iter_character_windows(self, text: str) -> Iterator[str]:
+        """以空分隔符分割並合併的結果：每 chunk_size - chunk_overlap 個字符切出一個 chunk_size 長的視窗
+
+        與 list(text) 後再合併的輸出完全相同，但不必為每個字符建立字串物件。
+        """
+        chunk_size = self._chunk_size
+        step = chunk_size - max(self._chunk_overlap, 0)
+        n = len(text)
+        for start in range(0, n, step):
+            yield text[start:start + chunk_size]
+            if start + chunk_size >= n:
+                return
+
     def _merge_splits(self, splits: list[str], separator: str) -> list[str]:
         """合併分割後的文本塊"""
-        if not splits:
-            return []
-        
-        merged = []
-        current_chunk = []
+        return list(self._iter_merge_splits(splits, separator))
+
+    def _iter_merge_splits(self, splits: list[str], separator: str) -> Iterator[str]:
+        """合併分割後的文本塊，每完成一個塊就立即產生"""
+        # map 在 C 層逐一呼叫長度函數；預設的 len 因此完全不經過 Python 位元組碼
+        lengths = list(map(self._length_function, splits))
+        for start, end in self._merge_windows(lengths):
+            yield separator.join(splits[start:end])
+
+    def _iter_merge_bounds(self, text: str, bounds: list[int]) -> Iterator[str]:
+        """合併首尾相接的分割，bounds[i]、bounds[i + 1] 為第 i 個分割在原文中的起訖位置"""
+        if self._length_function is len:
+            lengths = list(map(sub, bounds[1:], bounds[:-1]))
+        else:
+            lengths = [
+                self._length_function(text[start:end])
+                for start, end in zip(bounds, bounds[1:])
+            ]
+        for start, end in self._merge_windows(lengths):
+            yield text[bounds[start]:bounds[end]]
+
+    def _merge_offsets(
+        self, text: str, spans: list[tuple[int, int]]
+    ) -> list[tuple[int, int]]:
+        """合併分割的 (start, end) 位置，返回每個塊在原文中涵蓋的範圍"""
+        if self._length_function is len:
+            lengths = [end - start for start, end in spans]
+        else:
+            lengths = [self._length_function(text[start:end]) for start, end in spans]
+        return [
+            (spans[start][0], spans[end - 1][1])
+            for start, end in self._merge_windows(lengths)
+        ]
+
+    def _merge_windows(self, lengths: list[int]) -> Iterator[tuple[int, int]]:
+        """根據各分割的長度逐一產生每個合併塊涵蓋的分割索引範圍 [start, end)
+
+        只維護累計長度與視窗起點，裁剪重疊部分時減去被移出的分割長度，
+        不必重新加總整個塊。
+        """
+        # 迴圈內只使用區域變數，省去每次迭代的屬性查找
+        chunk_size = self._chunk_size
+        overlap = max(self._chunk_overlap, 0)
+        start = 0
         current_length = 0
         
-        for split in splits:
-            split_length = self._length_function(split)
-            
+        for end, split_length in enumerate(lengths):
             # 如果當前塊加上新分割會超過大小限制
-            if current_length + split_length > self._chunk_size and current_chunk:
-                # 保存當前塊
-                merged.append(separator.join(current_chunk))
+            if current_length + split_length > chunk_size and end > start:
+                # 產生當前塊
+                yield start, end
                 
-                # 開始新塊，保留重疊部分
-                overlap_start = max(0, len(current_chunk) - self._chunk_overlap)
-                current_chunk = current_chunk[overlap_start:]
-                current_length = sum(self._length_function(s) for s in current_chunk)
+                # 開始新塊，保留重疊部分（最後 chunk_overlap 個分割）
+                new_start = max(start, end - overlap)
+                current_length -= sum(lengths[start:new_start])
+                start = new_start
             
-            current_chunk.append(split)
             current_length += split_length
         
         # 添加最後一個塊
-        if current_chunk:
-            merged.append(separator.join(current_chunk))
-        
-        return merged
+        if start < len(lengths):
+            yield start, len(lengths)
 
 
 class CharacterTextSplitter(TextSplitter):
@@ -96,67 +185,231 @@ class CharacterTextSplitter(TextSplitter):
         self,
         separator: str = "\n\n",
         is_separator_regex: bool = False,
+        return_offsets: bool = False,
         **kwargs: Any,
     ) -> None:
-        """創建新的文本分割器"""
+        """創建新的文本分割器
+
+        return_offsets 為 True 時，split_text 返回每個塊在原文中的 (start, end) 位置，
+        而不是塊的字串內容，省去複製子字串的成本。
+        """
         super().__init__(**kwargs)
-        self._separator = separator
+        self._separator = sys.intern(separator)
         self._is_separator_regex = is_separator_regex
+        self._return_offsets = return_offsets
 
-    def split_text(self, text: str) -> list[str]:
-        """分割文本而不重新插入分隔符"""
-        # 1. 確定分割模式：原始正則表達式或轉義字面量
-        sep_pattern = (
-            self._separator if self._is_separator_regex else re.escape(self._separator)
+        # 1. 確定分割模式：正則分隔符只編譯一次，字面量分隔符直接使用字串查找
+        self._separator_pattern = (
+            _compile_separator_pattern(separator, True) if is_separator_regex else None
         )
 
-        # 2. 初始分割（如果請求則保留分隔符）
-        splits = _split_text_with_regex(
-            text, sep_pattern, keep_separator=self._keep_separator
-        )
-
-        # 3. 檢測零寬度前瞻後顧，這樣我們永遠不會重新插入它
+        # 2. 檢測零寬度前瞻後顧，這樣我們永遠不會重新插入它
         lookaround_prefixes = ("(?=", "(?<!", "(?<=", "(?!")
-        is_lookaround = self._is_separator_regex and any(
-            self._separator.startswith(p) for p in lookaround_prefixes
+        is_lookaround = is_separator_regex and any(
+            separator.startswith(p) for p in lookaround_prefixes
         )
 
-        # 4. 決定合併分隔符：
+        # 3. 決定合併分隔符：
         #    - 如果 keep_separator 或 lookaround -> 不重新插入
         #    - 否則 -> 重新插入字面量分隔符
-        merge_sep = ""
+        self._merge_separator = ""
         if not (self._keep_separator or is_lookaround):
-            merge_sep = self._separator
+            self._merge_separator = separator
+
+    def split_text(self, text: str) -> Union[list[str], list[tuple[int, int]]]:
+        """分割文本而不重新插入分隔符
+
+        長度不超過 chunk_size 的文本直接作為單一塊返回，不經過分割與合併。
+        """
+        return list(self.iter_split_text(text))
 
-        # 5. 合併相鄰分割並返回
-        return self._merge_splits(splits, merge_sep)
+    def iter_split_text(
+        self, text: str
+    ) -> Union[Iterator[str], Iterator[tuple[int, int]]]:
+        """逐一產生分割後的文本塊（或 return_offsets 時的位置）"""
+        n = self._length_function(text)
+        if n <= self._chunk_size:
+            if n:
+                yield (0, len(text)) if self._return_offsets else text
+            return
+
+        if self._return_offsets:
+            spans = _split_text_with_regex_offsets(
+                text,
+                self._separator_pattern or re.escape(self._separator),
+                keep_separator=self._keep_separator,
+            )
+            yield from self._merge_offsets(text, spans)
+            return
+
+        if not self._separator and self._slice_character_windows:
+            yield from self._iter_character_windows(text)
+            return
+
+        if self._keep_separator and self._separator and self._separator_pattern is None:
+            # 保留字面量分隔符時各分割在原文中首尾相接，合併後的塊就是原文的一段連續切片：
+            # 只計算分割邊界，每個塊從原文切片一次，不必先複製出各分割再 join
+            yield from self._iter_merge_bounds(
+                text,
+                _literal_split_bounds(
+                    text, self._separator, keep_separator=self._keep_separator
+                ),
+            )
+            return
+
+        # 初始分割（如果請求則保留分隔符）
+        if self._separator_pattern is None:
+            splits = _split_text_with_literal(
+                text, self._separator, keep_separator=self._keep_separator
+            )
+        else:
+            splits = _split_text_with_regex(
+                text, self._separator_pattern, keep_separator=self._keep_separator
+            )
+
+        # 合併相鄰分割並逐一產生
+        yield from self._iter_merge_splits(splits, self._merge_separator)
+
+
+# 正則表達式中具有特殊意義的字元；不含這些字元的正則分隔符等同字面量
+_REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+
+
+@lru_cache(maxsize=256)
+def _compile_separator(separator: str) -> re.Pattern:
+    """編譯並快取分隔符正則表達式"""
+    return re.compile(separator)
+
+
+def _compile_separator_pattern(
+    separator: str, is_separator_regex: bool
+) -> Optional[re.Pattern]:
+    """將分隔符編譯為正則表達式
+
+    返回 None 表示以字面量處理：空分隔符（逐字符分割），以及不含任何正則元字符的
+    正則分隔符（例如語言分隔符 "\nclass "），後者改走 str 的查找與分割，結果相同。
+    """
+    if not separator:
+        return None
+    if is_separator_regex and _REGEX_METACHARACTERS.isdisjoint(separator):
+        return None
+    return _compile_separator(separator if is_separator_regex else re.escape(separator))
 
 
 def _split_text_with_regex(
-    text: str, separator: str, *, keep_separator: Union[bool, Literal["start", "end"]]
+    text: str,
+    separator: Union[str, re.Pattern, None],
+    *,
+    keep_separator: Union[bool, Literal["start", "end"]],
 ) -> list[str]:
-    """使用正則表達式分割文本"""
+    """使用正則表達式分割文本
+
+    separator 可以是正則表達式字串或預先編譯好的 Pattern。
+    """
     # 現在我們有了分隔符，分割文本
     if separator:
+        pattern = (
+            separator if isinstance(separator, re.Pattern) else _compile_separator(separator)
+        )
         if keep_separator:
-            # 模式中的括號將分隔符保留在結果中
-            _splits = re.split(f"({separator})", text)
-            splits = (
-                ([_splits[i] + _splits[i + 1] for i in range(0, len(_splits) - 1, 2)])
-                if keep_separator == "end"
-                else ([_splits[i] + _splits[i + 1] for i in range(1, len(_splits), 2)])
-            )
-            if len(_splits) % 2 == 0:
-                splits += _splits[-1:]
-            splits = (
-                ([*splits, _splits[-1]])
-                if keep_separator == "end"
-                else ([_splits[0], *splits])
-            )
+            # 單次走訪所有匹配位置，直接從原文切片，不需要先 split 再兩兩重組
+            # "end" 模式在匹配結尾處切開（分隔符接在前一段之後），
+            # 其他模式在匹配開頭處切開（分隔符接在下一段之前）
+            cut_at_end = keep_separator == "end"
+            splits = []
+            last = 0
+            for match in pattern.finditer(text):
+                cut = match.end() if cut_at_end else match.start()
+                splits.append(text[last:cut])
+                last = cut
+            splits.append(text[last:])
         else:
-            splits = re.split(separator, text)
+            splits = pattern.split(text)
+    else:
+        splits = list(text)
+    return [s for s in splits if s != ""]
+
+
+def _split_text_with_regex_offsets(
+    text: str,
+    separator: Union[str, re.Pattern],
+    *,
+    keep_separator: Union[bool, Literal["start", "end"]],
+) -> list[tuple[int, int]]:
+    """與 _split_text_with_regex 相同的分割方式，但返回每個分割在原文中的 (start, end) 位置
+
+    不保留分隔符時，分割之間的分隔符不屬於任何分割。
+    """
+    if not separator:
+        return [(i, i + 1) for i in range(len(text))]
+    pattern = (
+        separator if isinstance(separator, re.Pattern) else _compile_separator(separator)
+    )
+    spans = []
+    last = 0
+    if keep_separator:
+        cut_at_end = keep_separator == "end"
+        for match in pattern.finditer(text):
+            cut = match.end() if cut_at_end else match.start()
+            spans.append((last, cut))
+            last = cut
     else:
+        for match in pattern.finditer(text):
+            spans.append((last, match.start()))
+            last = match.end()
+    spans.append((last, len(text)))
+    return [(start, end) for start, end in spans if start != end]
+
+
+def _literal_split_bounds(
+    text: str, separator: str, *, keep_separator: Union[bool, Literal["start", "end"]]
+) -> list[int]:
+    """保留字面量分隔符時的分割邊界，與 _split_text_with_literal 的各分割一一對應
+
+    相鄰邊界之間即為一個分割（含分隔符），因此所有分割首尾相接、涵蓋整段原文。
+    邊界由 str.split 各片段的長度累加求得，不建立任何帶分隔符的子字串。
+    """
+    parts = text.split(separator)
+    sep_len = len(separator)
+    cut_count = len(parts) - 1
+    # 第 i 個切點 = 前 i + 1 個片段的總長度 + 其間的分隔符長度；
+    # "end" 模式在分隔符結尾處切開，其他模式在分隔符開頭處切開
+    first = sep_len if keep_separator == "end" else 0
+    cuts = map(
+        add,
+        accumulate(map(len, parts[:-1])),
+        range(first, first + cut_count * sep_len, sep_len),
+    )
+    bounds = [0, *cuts, len(text)]
+    # 只有開頭或結尾的分割可能為空（原文以分隔符開頭或結尾），與字串版本一樣略過
+    if len(bounds) > 2 and bounds[1] == 0:
+        del bounds[1]
+    if len(bounds) > 2 and bounds[-2] == bounds[-1]:
+        del bounds[-2]
+    return bounds
+
+
+def _split_text_with_literal(
+    text: str, separator: str, *, keep_separator: Union[bool, Literal["start", "end"]]
+) -> list[str]:
+    """使用字面量分隔符分割文本
+
+    與 _split_text_with_regex 搭配 re.escape(separator) 的結果相同，
+    但只以一次 str.split 切開原文，需要保留分隔符時再把分隔符接回相鄰片段，不經過正則引擎。
+    """
+    if not separator:
         splits = list(text)
+    elif keep_separator:
+        # str.split 與正則相同，由左至右取不重疊的匹配；再把分隔符接回相鄰片段
+        parts = text.split(separator)
+        if keep_separator == "end":
+            splits = [s + separator for s in parts[:-1]]
+            splits.append(parts[-1])
+        else:
+            splits = [parts[0]]
+            splits.extend([separator + s for s in parts[1:]])
+    else:
+        splits = text.split(separator)
     return [s for s in splits if s != ""]
 
 
@@ -175,29 +428,55 @@ class RecursiveCharacterTextSplitter(TextSplitter):
     ) -> None:
         """創建新的文本分割器"""
         super().__init__(keep_separator=keep_separator, **kwargs)
-        self._separators = separators or ["\n\n", "\n", " ", ""]
+        # 駐留分隔符字串，語言分隔符與使用者傳入的相同分隔符共用同一物件
+        self._separators = [
+            sys.intern(s) for s in (separators or ["\n\n", "\n", " ", ""])
+        ]
         self._is_separator_regex = is_separator_regex
+        # 預先編譯所有正則分隔符，遞歸時以層級索引取用；
+        # 字面量分隔符對應 None，改用 str 的查找與分割
+        self._separator_patterns = [
+            _compile_separator_pattern(s, True) if is_separator_regex else None
+            for s in self._separators
+        ]
 
-    def _split_text(self, text: str, separators: list[str]) -> list[str]:
-        """分割傳入的文本並返回塊"""
-        final_chunks = []
+    def _iter_split_text(self, text: str, level: int = 0) -> Iterator[str]:
+        """分割傳入的文本並逐一產生塊
+
+        level 為本層開始嘗試的分隔符索引。
+        """
+        separators = self._separators
+        patterns = self._separator_patterns
         # 獲取適當的分隔符
         separator = separators[-1]
-        new_separators = []
-        for i, _s in enumerate(separators):
-            _separator = _s if self._is_separator_regex else re.escape(_s)
-            if _s == "":
-                separator = _s
+        pattern = patterns[-1]
+        next_level = len(separators)
+        for i in range(level, len(separators)):
+            if separators[i] == "":
+                separator = ""
+                pattern = None
                 break
-            if re.search(_separator, text):
-                separator = _s
-                new_separators = separators[i + 1 :]
+            found = (
+                separators[i] in text if patterns[i] is None else patterns[i].search(text)
+            )
+            if found:
+                separator = separators[i]
+                pattern = patterns[i]
+                next_level = i + 1
                 break
 
-        _separator = separator if self._is_separator_regex else re.escape(separator)
-        splits = _split_text_with_regex(
-            text, _separator, keep_separator=self._keep_separator
-        )
+        if not separator and self._slice_character_windows:
+            yield from self._iter_character_windows(text)
+            return
+
+        if pattern is None:
+            splits = _split_text_with_literal(
+                text, separator, keep_separator=self._keep_separator
+            )
+        else:
+            splits = _split_text_with_regex(
+                text, pattern, keep_separator=self._keep_separator
+            )
 
         # 現在開始合併，遞歸地分割較長的文本
         _good_splits = []
@@ -207,615 +486,54 @@ class RecursiveCharacterTextSplitter(TextSplitter):
                 _good_splits.append(s)
             else:
                 if _good_splits:
-                    merged_text = self._merge_splits(_good_splits, _separator)
-                    final_chunks.extend(merged_text)
+                    yield from self._iter_merge_splits(_good_splits, _separator)
                     _good_splits = []
-                if not new_separators:
-                    final_chunks.append(s)
+                if next_level >= len(separators):
+                    yield s
                 else:
-                    other_info = self._split_text(s, new_separators)
-                    final_chunks.extend(other_info)
+                    yield from self._iter_split_text(s, next_level)
         if _good_splits:
-            merged_text = self._merge_splits(_good_splits, _separator)
-            final_chunks.extend(merged_text)
-        return final_chunks
+            yield from self._iter_merge_splits(_good_splits, _separator)
 
     def split_text(self, text: str) -> list[str]:
-        """根據預定義的分隔符將輸入文本分割成較小的塊"""
-        return self._split_text(text, self._separators)
+        """根據預定義的分隔符將輸入文本分割成較小的塊
+
+        長度不超過 chunk_size 的文本直接作為單一塊返回，不經過分割與合併。
+        """
+        return list(self.iter_split_text(text))
+
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        """逐一產生分割後的文本塊，不必一次保留整篇文檔的所有塊"""
+        n = self._length_function(text)
+        if n <= self._chunk_size:
+            if n:
+                yield text
+            return
+        yield from self._iter_split_text(text, 0)
 
     @classmethod
     def from_language(
         cls, language: Language, **kwargs: Any
     ) -> RecursiveCharacterTextSplitter:
-        """根據特定語言返回此類的實例"""
-        separators = cls.get_separators_for_language(language)
-        return cls(separators=separators, is_separator_regex=True, **kwargs)
+        """根據特定語言返回此類的實例
+
+        分割器建立後只會被讀取，相同參數的呼叫共用同一個快取的實例；
+        參數無法雜湊時則每次建立新實例。
+        """
+        kwargs_items = tuple(sorted(kwargs.items()))
+        try:
+            hash(kwargs_items)
+        except TypeError:
+            separators = cls.get_separators_for_language(language)
+            return cls(separators=separators, is_separator_regex=True, **kwargs)
+        return _from_language_cached(cls, language, kwargs_items)
 
     @staticmethod
-    def get_separators_for_language(language: Language) -> list[str]:
-        """獲取給定語言的特定分隔符列表"""
-        if language in (Language.C, Language.CPP):
-            return [
-                # 沿類定義分割
-                "\nclass ",
-                # 沿函數定義分割
-                "\nvoid ",
-                "\nint ",
-                "\nfloat ",
-                "\ndouble ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nswitch ",
-                "\ncase ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.GO:
-            return [
-                # 沿函數定義分割
-                "\nfunc ",
-                "\nvar ",
-                "\nconst ",
-                "\ntype ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nswitch ",
-                "\ncase ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.JAVA:
-            return [
-                # 沿類定義分割
-                "\nclass ",
-                # 沿方法定義分割
-                "\npublic ",
-                "\nprotected ",
-                "\nprivate ",
-                "\nstatic ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nswitch ",
-                "\ncase ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.KOTLIN:
-            return [
-                # 沿類定義分割
-                "\nclass ",
-                # 沿方法定義分割
-                "\npublic ",
-                "\nprotected ",
-                "\nprivate ",
-                "\ninternal ",
-                "\ncompanion ",
-                "\nfun ",
-                "\nval ",
-                "\nvar ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nwhen ",
-                "\ncase ",
-                "\nelse ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.JS:
-            return [
-                # 沿函數定義分割
-                "\nfunction ",
-                "\nconst ",
-                "\nlet ",
-                "\nvar ",
-                "\nclass ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nswitch ",
-                "\ncase ",
-                "\ndefault ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.TS:
-            return [
-                "\nenum ",
-                "\ninterface ",
-                "\nnamespace ",
-                "\ntype ",
-                # 沿類定義分割
-                "\nclass ",
-                # 沿函數定義分割
-                "\nfunction ",
-                "\nconst ",
-                "\nlet ",
-                "\nvar ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nswitch ",
-                "\ncase ",
-                "\ndefault ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.PHP:
-            return [
-                # 沿函數定義分割
-                "\nfunction ",
-                # 沿類定義分割
-                "\nclass ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nforeach ",
-                "\nwhile ",
-                "\ndo ",
-                "\nswitch ",
-                "\ncase ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.PROTO:
-            return [
-                # 沿消息定義分割
-                "\nmessage ",
-                # 沿服務定義分割
-                "\nservice ",
-                # 沿枚舉定義分割
-                "\nenum ",
-                # 沿選項定義分割
-                "\noption ",
-                # 沿導入語句分割
-                "\nimport ",
-                # 沿語法聲明分割
-                "\nsyntax ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.PYTHON:
-            return [
-                # 首先，嘗試沿類定義分割
-                "\nclass ",
-                "\ndef ",
-                "\n\tdef ",
-                # 現在按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.RST:
-            return [
-                # 沿章節標題分割
-                "\n=+\n",
-                "\n-+\n",
-                "\n\\*+\n",
-                # 沿指令標記分割
-                "\n\n.. *\n\n",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.RUBY:
-            return [
-                # 沿方法定義分割
-                "\ndef ",
-                "\nclass ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nunless ",
-                "\nwhile ",
-                "\nfor ",
-                "\ndo ",
-                "\nbegin ",
-                "\nrescue ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.ELIXIR:
-            return [
-                # 沿方法函數和模組定義分割
-                "\ndef ",
-                "\ndefp ",
-                "\ndefmodule ",
-                "\ndefprotocol ",
-                "\ndefmacro ",
-                "\ndefmacrop ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nunless ",
-                "\nwhile ",
-                "\ncase ",
-                "\ncond ",
-                "\nwith ",
-                "\nfor ",
-                "\ndo ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.RUST:
-            return [
-                # 沿函數定義分割
-                "\nfn ",
-                "\nconst ",
-                "\nlet ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nwhile ",
-                "\nfor ",
-                "\nloop ",
-                "\nmatch ",
-                "\nconst ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.SCALA:
-            return [
-                # 沿類定義分割
-                "\nclass ",
-                "\nobject ",
-                # 沿方法定義分割
-                "\ndef ",
-                "\nval ",
-                "\nvar ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nmatch ",
-                "\ncase ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.SWIFT:
-            return [
-                # 沿函數定義分割
-                "\nfunc ",
-                # 沿類定義分割
-                "\nclass ",
-                "\nstruct ",
-                "\nenum ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\ndo ",
-                "\nswitch ",
-                "\ncase ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.MARKDOWN:
-            return [
-                # 首先，嘗試沿 Markdown 標題分割（從級別 2 開始）
-                "\n#{1,6} ",
-                # 注意：這裡不處理標題的替代語法（如下）
-                # 標題級別 2
-                # ---------------
-                # 代碼塊結束
-                "```\n",
-                # 水平線
-                "\n\\*\\*\\*+\n",
-                "\n---+\n",
-                "\n___+\n",
-                # 注意：此分割器不處理由 ***、--- 或 ___ 的三個或更多定義的水平線
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.LATEX:
-            return [
-                # 首先，嘗試沿 Latex 章節分割
-                "\n\\\\chapter{",
-                "\n\\\\section{",
-                "\n\\\\subsection{",
-                "\n\\\\subsubsection{",
-                # 現在按環境分割
-                "\n\\\\begin{enumerate}",
-                "\n\\\\begin{itemize}",
-                "\n\\\\begin{description}",
-                "\n\\\\begin{list}",
-                "\n\\\\begin{quote}",
-                "\n\\\\begin{quotation}",
-                "\n\\\\begin{verse}",
-                "\n\\\\begin{verbatim}",
-                # 現在按數學環境分割
-                "\n\\\\begin{align}",
-                "$$",
-                "$",
-                # 現在按正常行類型分割
-                " ",
-                "",
-            ]
-        if language == Language.HTML:
-            return [
-                # 首先，嘗試沿 HTML 標籤分割
-                "<body",
-                "<div",
-                "<p",
-                "<br",
-                "<li",
-                "<h1",
-                "<h2",
-                "<h3",
-                "<h4",
-                "<h5",
-                "<h6",
-                "<span",
-                "<table",
-                "<tr",
-                "<td",
-                "<th",
-                "<ul",
-                "<ol",
-                "<header",
-                "<footer",
-                "<nav",
-                # Head
-                "<head",
-                "<style",
-                "<script",
-                "<meta",
-                "<title",
-                "",
-            ]
-        if language == Language.CSHARP:
-            return [
-                "\ninterface ",
-                "\nenum ",
-                "\nimplements ",
-                "\ndelegate ",
-                "\nevent ",
-                # 沿類定義分割
-                "\nclass ",
-                "\nabstract ",
-                # 沿方法定義分割
-                "\npublic ",
-                "\nprotected ",
-                "\nprivate ",
-                "\nstatic ",
-                "\nreturn ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\ncontinue ",
-                "\nfor ",
-                "\nforeach ",
-                "\nwhile ",
-                "\nswitch ",
-                "\nbreak ",
-                "\ncase ",
-                "\nelse ",
-                # 按異常分割
-                "\ntry ",
-                "\nthrow ",
-                "\nfinally ",
-                "\ncatch ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.SOL:
-            return [
-                # 沿編譯器信息定義分割
-                "\npragma ",
-                "\nusing ",
-                # 沿合約定義分割
-                "\ncontract ",
-                "\ninterface ",
-                "\nlibrary ",
-                # 沿方法定義分割
-                "\nconstructor ",
-                "\ntype ",
-                "\nfunction ",
-                "\nevent ",
-                "\nmodifier ",
-                "\nerror ",
-                "\nstruct ",
-                "\nenum ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\ndo while ",
-                "\nassembly ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.COBOL:
-            return [
-                # 沿分區分割
-                "\nIDENTIFICATION DIVISION.",
-                "\nENVIRONMENT DIVISION.",
-                "\nDATA DIVISION.",
-                "\nPROCEDURE DIVISION.",
-                # 沿 DATA DIVISION 內的節分割
-                "\nWORKING-STORAGE SECTION.",
-                "\nLINKAGE SECTION.",
-                "\nFILE SECTION.",
-                # 沿 PROCEDURE DIVISION 內的節分割
-                "\nINPUT-OUTPUT SECTION.",
-                # 沿段落和常見語句分割
-                "\nOPEN ",
-                "\nCLOSE ",
-                "\nREAD ",
-                "\nWRITE ",
-                "\nIF ",
-                "\nELSE ",
-                "\nMOVE ",
-                "\nPERFORM ",
-                "\nUNTIL ",
-                "\nVARYING ",
-                "\nACCEPT ",
-                "\nDISPLAY ",
-                "\nSTOP RUN.",
-                # 按正常行類型分割
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.LUA:
-            return [
-                # 沿變量和表定義分割
-                "\nlocal ",
-                # 沿函數定義分割
-                "\nfunction ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nfor ",
-                "\nwhile ",
-                "\nrepeat ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.HASKELL:
-            return [
-                # 沿函數定義分割
-                "\nmain :: ",
-                "\nmain = ",
-                "\nlet ",
-                "\nin ",
-                "\ndo ",
-                "\nwhere ",
-                "\n:: ",
-                "\n= ",
-                # 沿類型聲明分割
-                "\ndata ",
-                "\nnewtype ",
-                "\ntype ",
-                "\n:: ",
-                # 沿模組聲明分割
-                "\nmodule ",
-                # 沿導入語句分割
-                "\nimport ",
-                "\nqualified ",
-                "\nimport qualified ",
-                # 沿類型類聲明分割
-                "\nclass ",
-                "\ninstance ",
-                # 沿 case 表達式分割
-                "\ncase ",
-                # 沿函數定義中的守衛分割
-                "\n| ",
-                # 沿記錄字段聲明分割
-                "\ndata ",
-                "\n= {",
-                "\n, ",
-                # 按正常行類型分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.POWERSHELL:
-            return [
-                # 沿函數定義分割
-                "\nfunction ",
-                # 沿參數聲明分割（轉義括號）
-                "\nparam ",
-                # 沿控制流語句分割
-                "\nif ",
-                "\nforeach ",
-                "\nfor ",
-                "\nwhile ",
-                "\nswitch ",
-                # 沿類定義分割（適用於 PowerShell 5.0 及以上版本）
-                "\nclass ",
-                # 沿 try-catch-finally 塊分割
-                "\ntry ",
-                "\ncatch ",
-                "\nfinally ",
-                # 按正常行和空空格分割
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ]
-        if language == Language.VISUALBASIC6:
-            vis = r"(?:Public|Private|Friend|Global|Static)\s+"
-            return [
-                # 沿定義分割
-                rf"\n(?!End\s){vis}?Sub\s+",
-                rf"\n(?!End\s){vis}?Function\s+",
-                rf"\n(?!End\s){vis}?Property\s+(?:Get|Let|Set)\s+",
-                rf"\n(?!End\s){vis}?Type\s+",
-                rf"\n(?!End\s){vis}?Enum\s+",
-                # 沿控制流語句分割
-                r"\n(?!End\s)If\s+",
-                r"\nElseIf\s+",
-                r"\nElse\s+",
-                r"\nSelect\s+Case\s+",
-                r"\nCase\s+",
-                r"\nFor\s+",
-                r"\nDo\s+",
-                r"\nWhile\s+",
-                r"\nWith\s+",
-                # 按正常行類型分割
-                r"\n\n",
-                r"\n",
-                " ",
-                "",
-            ]
+    def get_separators_for_language(language: Language) -> tuple[str, ...]:
+        """獲取給定語言的特定分隔符（共用的唯讀元組）"""
+        separators = _LANGUAGE_SEPARATORS.get(language)
+        if separators is not None:
+            return separators
 
         if language in Language._value2member_map_:
             msg = f"Language {language} is not implemented yet!"
@@ -824,3 +542,530 @@ class RecursiveCharacterTextSplitter(TextSplitter):
             f"Language {language} is not supported! Please choose from {list(Language)}"
         )
         raise ValueError(msg)
+
+
+@lru_cache(maxsize=64)
+def _from_language_cached(
+    cls: type[RecursiveCharacterTextSplitter],
+    language: Language,
+    kwargs_items: tuple[tuple[str, Any], ...],
+) -> RecursiveCharacterTextSplitter:
+    """依 (類別, 語言, 參數) 快取 from_language 建立的分割器"""
+    separators = cls.get_separators_for_language(language)
+    return cls(separators=separators, is_separator_regex=True, **dict(kwargs_items))
+
+
+_VISUALBASIC6_VISIBILITY = r"(?:Public|Private|Friend|Global|Static)\s+"
+
+# 多數語言共用的尾端分隔符：段落、換行、空白，最後逐字符分割
+_TAIL = ("\n\n", "\n", " ", "")
+
+# C 與 C++ 共用同一份分隔符元組
+_C_FAMILY_SEPARATORS = (
+    # 沿類定義分割
+    "\nclass ",
+    # 沿函數定義分割
+    "\nvoid ",
+    "\nint ",
+    "\nfloat ",
+    "\ndouble ",
+    # 沿控制流語句分割
+    "\nif ",
+    "\nfor ",
+    "\nwhile ",
+    "\nswitch ",
+    "\ncase ",
+    # 按正常行類型分割
+    *_TAIL,
+)
+
+# 各語言的分隔符元組，於模組載入時建立一次，get_separators_for_language 直接查表
+_LANGUAGE_SEPARATORS: dict[str, tuple[str, ...]] = {
+    Language.C: _C_FAMILY_SEPARATORS,
+    Language.CPP: _C_FAMILY_SEPARATORS,
+    Language.GO: (
+        # 沿函數定義分割
+        "\nfunc ",
+        "\nvar ",
+        "\nconst ",
+        "\ntype ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nswitch ",
+        "\ncase ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.JAVA: (
+        # 沿類定義分割
+        "\nclass ",
+        # 沿方法定義分割
+        "\npublic ",
+        "\nprotected ",
+        "\nprivate ",
+        "\nstatic ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\nswitch ",
+        "\ncase ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.KOTLIN: (
+        # 沿類定義分割
+        "\nclass ",
+        # 沿方法定義分割
+        "\npublic ",
+        "\nprotected ",
+        "\nprivate ",
+        "\ninternal ",
+        "\ncompanion ",
+        "\nfun ",
+        "\nval ",
+        "\nvar ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\nwhen ",
+        "\ncase ",
+        "\nelse ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.JS: (
+        # 沿函數定義分割
+        "\nfunction ",
+        "\nconst ",
+        "\nlet ",
+        "\nvar ",
+        "\nclass ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\nswitch ",
+        "\ncase ",
+        "\ndefault ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.TS: (
+        "\nenum ",
+        "\ninterface ",
+        "\nnamespace ",
+        "\ntype ",
+        # 沿類定義分割
+        "\nclass ",
+        # 沿函數定義分割
+        "\nfunction ",
+        "\nconst ",
+        "\nlet ",
+        "\nvar ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\nswitch ",
+        "\ncase ",
+        "\ndefault ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.PHP: (
+        # 沿函數定義分割
+        "\nfunction ",
+        # 沿類定義分割
+        "\nclass ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nforeach ",
+        "\nwhile ",
+        "\ndo ",
+        "\nswitch ",
+        "\ncase ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.PROTO: (
+        # 沿消息定義分割
+        "\nmessage ",
+        # 沿服務定義分割
+        "\nservice ",
+        # 沿枚舉定義分割
+        "\nenum ",
+        # 沿選項定義分割
+        "\noption ",
+        # 沿導入語句分割
+        "\nimport ",
+        # 沿語法聲明分割
+        "\nsyntax ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.PYTHON: (
+        # 首先，嘗試沿類定義分割
+        "\nclass ",
+        "\ndef ",
+        "\n\tdef ",
+        # 現在按正常行類型分割
+        *_TAIL,
+    ),
+    Language.RST: (
+        # 沿章節標題分割
+        "\n=+\n",
+        "\n-+\n",
+        "\n\\*+\n",
+        # 沿指令標記分割
+        "\n\n.. *\n\n",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.RUBY: (
+        # 沿方法定義分割
+        "\ndef ",
+        "\nclass ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nunless ",
+        "\nwhile ",
+        "\nfor ",
+        "\ndo ",
+        "\nbegin ",
+        "\nrescue ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.ELIXIR: (
+        # 沿方法函數和模組定義分割
+        "\ndef ",
+        "\ndefp ",
+        "\ndefmodule ",
+        "\ndefprotocol ",
+        "\ndefmacro ",
+        "\ndefmacrop ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nunless ",
+        "\nwhile ",
+        "\ncase ",
+        "\ncond ",
+        "\nwith ",
+        "\nfor ",
+        "\ndo ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.RUST: (
+        # 沿函數定義分割
+        "\nfn ",
+        "\nconst ",
+        "\nlet ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nwhile ",
+        "\nfor ",
+        "\nloop ",
+        "\nmatch ",
+        "\nconst ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.SCALA: (
+        # 沿類定義分割
+        "\nclass ",
+        "\nobject ",
+        # 沿方法定義分割
+        "\ndef ",
+        "\nval ",
+        "\nvar ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\nmatch ",
+        "\ncase ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.SWIFT: (
+        # 沿函數定義分割
+        "\nfunc ",
+        # 沿類定義分割
+        "\nclass ",
+        "\nstruct ",
+        "\nenum ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\ndo ",
+        "\nswitch ",
+        "\ncase ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.MARKDOWN: (
+        # 首先，嘗試沿 Markdown 標題分割（從級別 2 開始）
+        "\n#{1,6} ",
+        # 注意：這裡不處理標題的替代語法（如下）
+        # 標題級別 2
+        # ---------------
+        # 代碼塊結束
+        "```\n",
+        # 水平線
+        "\n\\*\\*\\*+\n",
+        "\n---+\n",
+        "\n___+\n",
+        # 注意：此分割器不處理由 ***、--- 或 ___ 的三個或更多定義的水平線
+        *_TAIL,
+    ),
+    Language.LATEX: (
+        # 首先，嘗試沿 Latex 章節分割
+        "\n\\\\chapter{",
+        "\n\\\\section{",
+        "\n\\\\subsection{",
+        "\n\\\\subsubsection{",
+        # 現在按環境分割
+        "\n\\\\begin{enumerate}",
+        "\n\\\\begin{itemize}",
+        "\n\\\\begin{description}",
+        "\n\\\\begin{list}",
+        "\n\\\\begin{quote}",
+        "\n\\\\begin{quotation}",
+        "\n\\\\begin{verse}",
+        "\n\\\\begin{verbatim}",
+        # 現在按數學環境分割
+        "\n\\\\begin{align}",
+        "$$",
+        "$",
+        # 現在按正常行類型分割
+        " ",
+        "",
+    ),
+    Language.HTML: (
+        # 首先，嘗試沿 HTML 標籤分割
+        "<body",
+        "<div",
+        "<p",
+        "<br",
+        "<li",
+        "<h1",
+        "<h2",
+        "<h3",
+        "<h4",
+        "<h5",
+        "<h6",
+        "<span",
+        "<table",
+        "<tr",
+        "<td",
+        "<th",
+        "<ul",
+        "<ol",
+        "<header",
+        "<footer",
+        "<nav",
+        # Head
+        "<head",
+        "<style",
+        "<script",
+        "<meta",
+        "<title",
+        "",
+    ),
+    Language.CSHARP: (
+        "\ninterface ",
+        "\nenum ",
+        "\nimplements ",
+        "\ndelegate ",
+        "\nevent ",
+        # 沿類定義分割
+        "\nclass ",
+        "\nabstract ",
+        # 沿方法定義分割
+        "\npublic ",
+        "\nprotected ",
+        "\nprivate ",
+        "\nstatic ",
+        "\nreturn ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\ncontinue ",
+        "\nfor ",
+        "\nforeach ",
+        "\nwhile ",
+        "\nswitch ",
+        "\nbreak ",
+        "\ncase ",
+        "\nelse ",
+        # 按異常分割
+        "\ntry ",
+        "\nthrow ",
+        "\nfinally ",
+        "\ncatch ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.SOL: (
+        # 沿編譯器信息定義分割
+        "\npragma ",
+        "\nusing ",
+        # 沿合約定義分割
+        "\ncontract ",
+        "\ninterface ",
+        "\nlibrary ",
+        # 沿方法定義分割
+        "\nconstructor ",
+        "\ntype ",
+        "\nfunction ",
+        "\nevent ",
+        "\nmodifier ",
+        "\nerror ",
+        "\nstruct ",
+        "\nenum ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\ndo while ",
+        "\nassembly ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.COBOL: (
+        # 沿分區分割
+        "\nIDENTIFICATION DIVISION.",
+        "\nENVIRONMENT DIVISION.",
+        "\nDATA DIVISION.",
+        "\nPROCEDURE DIVISION.",
+        # 沿 DATA DIVISION 內的節分割
+        "\nWORKING-STORAGE SECTION.",
+        "\nLINKAGE SECTION.",
+        "\nFILE SECTION.",
+        # 沿 PROCEDURE DIVISION 內的節分割
+        "\nINPUT-OUTPUT SECTION.",
+        # 沿段落和常見語句分割
+        "\nOPEN ",
+        "\nCLOSE ",
+        "\nREAD ",
+        "\nWRITE ",
+        "\nIF ",
+        "\nELSE ",
+        "\nMOVE ",
+        "\nPERFORM ",
+        "\nUNTIL ",
+        "\nVARYING ",
+        "\nACCEPT ",
+        "\nDISPLAY ",
+        "\nSTOP RUN.",
+        # 按正常行類型分割
+        "\n",
+        " ",
+        "",
+    ),
+    Language.LUA: (
+        # 沿變量和表定義分割
+        "\nlocal ",
+        # 沿函數定義分割
+        "\nfunction ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nfor ",
+        "\nwhile ",
+        "\nrepeat ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.HASKELL: (
+        # 沿函數定義分割
+        "\nmain :: ",
+        "\nmain = ",
+        "\nlet ",
+        "\nin ",
+        "\ndo ",
+        "\nwhere ",
+        "\n:: ",
+        "\n= ",
+        # 沿類型聲明分割
+        "\ndata ",
+        "\nnewtype ",
+        "\ntype ",
+        "\n:: ",
+        # 沿模組聲明分割
+        "\nmodule ",
+        # 沿導入語句分割
+        "\nimport ",
+        "\nqualified ",
+        "\nimport qualified ",
+        # 沿類型類聲明分割
+        "\nclass ",
+        "\ninstance ",
+        # 沿 case 表達式分割
+        "\ncase ",
+        # 沿函數定義中的守衛分割
+        "\n| ",
+        # 沿記錄字段聲明分割
+        "\ndata ",
+        "\n= {",
+        "\n, ",
+        # 按正常行類型分割
+        *_TAIL,
+    ),
+    Language.POWERSHELL: (
+        # 沿函數定義分割
+        "\nfunction ",
+        # 沿參數聲明分割（轉義括號）
+        "\nparam ",
+        # 沿控制流語句分割
+        "\nif ",
+        "\nforeach ",
+        "\nfor ",
+        "\nwhile ",
+        "\nswitch ",
+        # 沿類定義分割（適用於 PowerShell 5.0 及以上版本）
+        "\nclass ",
+        # 沿 try-catch-finally 塊分割
+        "\ntry ",
+        "\ncatch ",
+        "\nfinally ",
+        # 按正常行和空空格分割
+        *_TAIL,
+    ),
+    Language.VISUALBASIC6: (
+        # 沿定義分割
+        rf"\n(?!End\s){_VISUALBASIC6_VISIBILITY}?Sub\s+",
+        rf"\n(?!End\s){_VISUALBASIC6_VISIBILITY}?Function\s+",
+        rf"\n(?!End\s){_VISUALBASIC6_VISIBILITY}?Property\s+(?:Get|Let|Set)\s+",
+        rf"\n(?!End\s){_VISUALBASIC6_VISIBILITY}?Type\s+",
+        rf"\n(?!End\s){_VISUALBASIC6_VISIBILITY}?Enum\s+",
+        # 沿控制流語句分割
+        r"\n(?!End\s)If\s+",
+        r"\nElseIf\s+",
+        r"\nElse\s+",
+        r"\nSelect\s+Case\s+",
+        r"\nCase\s+",
+        r"\nFor\s+",
+        r"\nDo\s+",
+        r"\nWhile\s+",
+        r"\nWith\s+",
+        # 按正常行類型分割
+        r"\n\n",
+        r"\n",
+        " ",
+        "",
+    ),
+}
+
+# 模組載入時駐留所有語言分隔符；內容相同的元組（如 C/C++）仍共用同一個物件
+_interned_separators: dict[tuple[str, ...], tuple[str, ...]] = {}
+_LANGUAGE_SEPARATORS = {
+    language: _interned_separators.setdefault(
+        separators, tuple(sys.intern(s) for s in separators)
+    )
+    for language, separators in _LANGUAGE_SEPARATORS.items()
+}
+del _interned_separators
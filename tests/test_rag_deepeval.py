@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from pydantic import BaseModel
+
+from src import rag_deepeval
+from src.rag_deepeval import CustomLLMJudge
+
+
+class _Verdict(BaseModel):
+    score: int
+
+
+class _ChatCompletionHandler(BaseHTTPRequestHandler):
+    """最小的 OpenAI 相容端點：每個請求都回覆 {"score": 1}，並保持連線讓 client 重用"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": '{"score": 1}'},
+            }],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def judge_endpoint():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _judge(base_url: str) -> CustomLLMJudge:
+    return CustomLLMJudge(model="stub", base_url=base_url, api_key="test")
+
+
+# 每次呼叫都使用不同的提示以避開結果快取，確保請求真的送到端點；
+# 失敗時評審會返回 score=0 的預設實例，因此斷言 score == 1 即可偵測
+
+def test_judge_works_across_event_loops(judge_endpoint):
+    assert _judge(judge_endpoint).generate("sync before", _Verdict).score == 1
+    assert asyncio.run(
+        _judge(judge_endpoint).a_generate("asyncio.run", _Verdict)
+    ).score == 1
+    assert _judge(judge_endpoint).generate("sync after", _Verdict).score == 1
+
+
+def test_judge_generate_from_worker_thread(judge_endpoint):
+    assert _judge(judge_endpoint).generate("main thread", _Verdict).score == 1
+
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.append(
+            _judge(judge_endpoint).generate("worker thread", _Verdict)
+        )
+    )
+    worker.start()
+    worker.join()
+    assert results and results[0].score == 1
+
+
+def test_event_loop_errors_are_not_masked_by_default_verdict(judge_endpoint, monkeypatch):
+    async def broken_client(base_url, api_key):
+        raise RuntimeError("bound to a different event loop")
+
+    monkeypatch.setattr(rag_deepeval, "_shared_async_client", broken_client)
+    with pytest.raises(RuntimeError):
+        _judge(judge_endpoint).generate("loop error", _Verdict)